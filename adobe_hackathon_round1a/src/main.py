@@ -1,8 +1,86 @@
 import os
 import json
+import hashlib
+import stat
+import tempfile
 import fitz
-from collections import defaultdict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache, wraps
+from itertools import takewhile
 
+try:
+    import orjson # Optional, much faster JSON serialisation
+except ImportError:
+    orjson = None
+
+# Headings are assumed to be at least this fraction of the document's largest font size
+MIN_HEADING_REL_SIZE = 0.50
+
+# Default "dict" extraction flags minus image blocks, which we never look at
+# but which PyMuPDF would otherwise decode and copy into the result.
+TEXT_EXTRACTION_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# On-disk cache of extraction results, keyed by file path, mtime and size so
+# re-runs over unchanged PDFs skip parsing entirely. The key also covers this
+# module's source and the PyMuPDF version, so editing the heuristics or
+# upgrading PyMuPDF never serves stale results.
+# Per-user directory; it is only used when it is private to us (see _cache_dir_is_private).
+PDF_CACHE_DIR = os.path.join(tempfile.gettempdir(), f"pdfcache-{os.getuid()}")
+
+with open(__file__, 'rb') as _source_file:
+    _EXTRACTOR_VERSION = f"{hashlib.blake2b(_source_file.read(), digest_size=16).hexdigest()}:{fitz.VersionBind}"
+
+def _cache_key(pdf_path, namespace):
+    pdf_stat = os.stat(pdf_path)
+    raw_key = f"{namespace}:{_EXTRACTOR_VERSION}:{os.path.abspath(pdf_path)}:{pdf_stat.st_mtime_ns}:{pdf_stat.st_size}"
+    return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+def _cache_dir_is_private():
+    """Creates PDF_CACHE_DIR if needed; True only if it is a real directory owned by us with mode 0700."""
+    try:
+        os.makedirs(PDF_CACHE_DIR, mode=0o700, exist_ok=True)
+        dir_stat = os.lstat(PDF_CACHE_DIR)
+    except OSError:
+        return False
+    return stat.S_ISDIR(dir_stat.st_mode) and dir_stat.st_uid == os.getuid() and not dir_stat.st_mode & 0o077
+
+def cached_extraction(func):
+    """Caches the (title, outline) returned by an extraction function on disk."""
+    @wraps(func)
+    def wrapper(pdf_path):
+        if not _cache_dir_is_private():
+            return func(pdf_path)
+
+        cache_path = os.path.join(PDF_CACHE_DIR, _cache_key(pdf_path, func.__name__) + ".json")
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                title, items = json.load(f)
+            return title, items
+        except (OSError, ValueError, TypeError):
+            pass # Cache miss or unreadable entry: extract again
+
+        result = func(pdf_path)
+
+        try:
+            # Write to a per-process temp file first so concurrent workers never see a partial entry
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: could not write extraction cache for {pdf_path}: {e}")
+        return result
+    return wrapper
+
+@lru_cache(maxsize=512)
+def _is_bold(font_name):
+    """Whether a font name denotes a bold face. Documents use only a handful of
+    fonts, so the answer is cached per name instead of recomputed per span."""
+    font_name = font_name.lower()
+    return "bold" in font_name or "heavy" in font_name
+
+@cached_extraction
 def extract_document_outline(pdf_path):
    
     title = ""
@@ -12,23 +90,19 @@ def extract_document_outline(pdf_path):
     # These are relative to the largest font size found in the document.
     # We will determine these dynamically.
     
-    # Store text blocks with their properties for analysis
-    text_blocks_by_page = defaultdict(list)
-
-    try:
-        document = fitz.open(pdf_path)
+    # Store text spans with their properties for analysis as one flat list of
+    # (text, font_size, is_bold, y0, page) rows, in document order.
+    rows = []
+    max_font_size = 0.0
 
-        # First pass: Extract all text blocks with font information
-        # and find the largest font size to set relative thresholds
-        max_font_size = 0.0
-
-        for page_num in range(document.page_count):
-            page = document.load_page(page_num)
-            
+    # First pass: Extract all text spans with font information.
+    # The document (and its file handle) is closed as soon as reading is done.
+    with fitz.open(pdf_path) as document:
+        for page in document:
             # Using get_text("dict") provides detailed information about blocks, lines, spans
-            # This is crucial for font details.
-            text_dict = page.get_text("dict")
-            
+            # This is crucial for font details. Image blocks are never used, so skip building them.
+            text_dict = page.get_text("dict", flags=TEXT_EXTRACTION_FLAGS)
+        
             for block in text_dict['blocks']:
                 if block['type'] == 0:  # Text block
                     for line in block['lines']:
@@ -36,121 +110,139 @@ def extract_document_outline(pdf_path):
                             text = span['text'].strip()
                             if text: # Only consider non-empty text
                                 font_size = round(span['size'], 2)
-                                is_bold = "bold" in span['font'].lower() or "heavy" in span['font'].lower()
-                                
-                                # Store text block details
-                                text_blocks_by_page[page_num + 1].append({
-                                    "text": text,
-                                    "font_size": font_size,
-                                    "is_bold": is_bold,
-                                    "bbox": span['bbox'], # (x0, y0, x1, y1)
-                                    "line_length": len(line['spans']) # Number of spans in the line
-                                })
-                                
+                                # Track the largest font size to set relative thresholds.
+                                # The running max never exceeds the final one, so a span below
+                                # half of it can never reach MIN_HEADING_FONT_SIZE; skip storing
+                                # most body text. The very first span is always kept, so page 1's
+                                # first text remains available for the title fallback.
                                 if font_size > max_font_size:
                                     max_font_size = font_size
-        
-        # Define font size thresholds relative to the maximum found font size
-        # These are empirical values and might need adjustment.
-        # A 10% difference can indicate a significant size change for headings.
-        H1_THRESHOLD = max_font_size * 0.95 # H1 is usually very close to max_font_size
-        H2_THRESHOLD = max_font_size * 0.80 # H2 is noticeably smaller than H1
-        H3_THRESHOLD = max_font_size * 0.65 # H3 is smaller than H2
-        
-        # Add a minimum font size to consider for headings to avoid body text
-        MIN_HEADING_FONT_SIZE = max_font_size * 0.50 # Assuming headings are at least 50% of max font size
+                                elif font_size < max_font_size * MIN_HEADING_REL_SIZE:
+                                    continue
+                                is_bold = _is_bold(span['font'])
+                                rows.append((text, font_size, is_bold, span['bbox'][1], page.number + 1))
 
-        print(f"Max Font Size Detected: {max_font_size}")
-        print(f"H1 Threshold: {H1_THRESHOLD}, H2 Threshold: {H2_THRESHOLD}, H3 Threshold: {H3_THRESHOLD}")
+    sizes = np.array([row[1] for row in rows], dtype=np.float64)
+    
+    # Define font size thresholds relative to the maximum found font size
+    # These are empirical values and might need adjustment.
+    # A 10% difference can indicate a significant size change for headings.
+    H1_THRESHOLD = max_font_size * 0.95 # H1 is usually very close to max_font_size
+    H2_THRESHOLD = max_font_size * 0.80 # H2 is noticeably smaller than H1
+    H3_THRESHOLD = max_font_size * 0.65 # H3 is smaller than H2
+    
+    # Add a minimum font size to consider for headings to avoid body text
+    MIN_HEADING_FONT_SIZE = max_font_size * MIN_HEADING_REL_SIZE # Assuming headings are at least 50% of max font size
 
-        # Second pass: Identify title and headings based on collected properties
-        # We need to process page by page to capture page numbers correctly
+    print(f"Max Font Size Detected: {max_font_size}")
+    print(f"H1 Threshold: {H1_THRESHOLD}, H2 Threshold: {H2_THRESHOLD}, H3 Threshold: {H3_THRESHOLD}")
+
+    # Second pass: Identify title and headings based on collected properties
+    
+    # Logic to find Title: Assume the largest text on the first page is the title
+    # Or, the largest, boldest text block on the first page
+    # Rows are in page order, so page 1 is a prefix of the flat list.
+    first_page_rows = list(takewhile(lambda row: row[4] == 1, rows))
+    title_candidates = [row for row in first_page_rows if row[1] >= H1_THRESHOLD and row[2]]
+    
+    if title_candidates:
+        # Sort by font size descending, then by y0 (top position) ascending
+        title_candidates.sort(key=lambda x: (-x[1], x[3]))
+        title = title_candidates[0][0]
+    elif first_page_rows:
+        # Fallback: if no clear bold H1-sized title on page 1, take the first substantial text
+        title = first_page_rows[0][0] # take first text on page 1 as title fallback
+
+    # Classify every span by font size in one vectorized step; spans smaller
+    # than the minimum heading size get no level.
+    levels = np.select(
+        [sizes >= H1_THRESHOLD, sizes >= H2_THRESHOLD, sizes >= H3_THRESHOLD],
+        ["H1", "H2", "H3"],
+        default=""
+    )
+    levels[sizes < MIN_HEADING_FONT_SIZE] = ""
+
+    # Now, walk the candidate headings in document order
+    seen_headings = set() # (text, page) pairs already added to the outline
+    for idx in np.flatnonzero(levels != ""):
+        text, font_size, is_bold, y0, current_page_number = rows[idx]
+        level = str(levels[idx])
         
-        # Logic to find Title: Assume the largest text on the first page is the title
-        # Or, the largest, boldest text block on the first page
-        title_candidates = []
-        if 1 in text_blocks_by_page:
-            for block in text_blocks_by_page[1]:
-                if block['font_size'] >= H1_THRESHOLD and block['is_bold']:
-                    title_candidates.append(block)
+        # Filter out text that is likely just a few characters
+        if len(text) < 3:
+            continue
         
-        if title_candidates:
-            # Sort by font size descending, then by y0 (top position) ascending
-            title_candidates.sort(key=lambda x: (-x['font_size'], x['bbox'][1]))
-            title = title_candidates[0]['text']
-        else:
-            # Fallback: if no clear bold H1-sized title on page 1, take the first substantial text
-            if 1 in text_blocks_by_page and text_blocks_by_page[1]:
-                title = text_blocks_by_page[1][0]['text'] # take first text on page 1 as title fallback
-
-        # Now, iterate through all pages and blocks to find headings
-        for page_num in range(document.page_count):
-            current_page_number = page_num + 1
-            if current_page_number not in text_blocks_by_page:
-                continue
-
-            for block in text_blocks_by_page[current_page_number]:
-                text = block['text']
-                font_size = block['font_size']
-                is_bold = block['is_bold']
-                
-                # Filter out very small text and text that is likely just a few characters
-                if font_size < MIN_HEADING_FONT_SIZE or len(text) < 3:
-                    continue
-
-                level = None
-                if font_size >= H1_THRESHOLD:
-                    level = "H1"
-                elif font_size >= H2_THRESHOLD:
-                    level = "H2"
-                elif font_size >= H3_THRESHOLD:
-                    level = "H3"
-                
-                # Additional heuristic: Headings are often bold or have significant line breaks/spacing
-                # For simplicity, we are heavily relying on font size + bold for now.
-                # More advanced logic would involve checking preceding/following whitespace,
-                # text alignment (left, center), and overall document flow.
-                
-                if level:
-                    # Prevent adding the same title as an H1 if it's already identified
-                    if level == "H1" and text == title and current_page_number == 1:
-                        continue
-                    
-                    # Basic de-duplication: Avoid adding the same heading multiple times
-                    # This check is simple and might miss slight variations.
-                    is_duplicate = False
-                    for existing_heading in outline:
-                        if existing_heading["text"] == text and existing_heading["page"] == current_page_number:
-                            is_duplicate = True
-                            break
-                    
-                    if not is_duplicate:
-                        outline.append({
-                            "level": level,
-                            "text": text,
-                            "page": current_page_number
-                        })
+        # Additional heuristic: Headings are often bold or have significant line breaks/spacing
+        # For simplicity, we are heavily relying on font size + bold for now.
+        # More advanced logic would involve checking preceding/following whitespace,
+        # text alignment (left, center), and overall document flow.
+        
+        # Prevent adding the same title as an H1 if it's already identified
+        if level == "H1" and text == title and current_page_number == 1:
+            continue
         
-        # Sort the outline: first by page number, then by inferred heading level prominence (H1 > H2 > H3),
-        # then by vertical position (y0) on the page.
-        # This is crucial for maintaining hierarchy and order.
-        level_order = {"H1": 1, "H2": 2, "H3": 3}
-        outline.sort(key=lambda x: (x["page"], level_order.get(x["level"], 99))) # bbox['y0'] is not directly in 'outline' anymore
-                                                                                # Need to re-think sort if we want vertical position
+        # Basic de-duplication: Avoid adding the same heading multiple times
+        # This check is simple and might miss slight variations.
+        heading_key = (text, current_page_number)
+        if heading_key in seen_headings:
+            continue
+        seen_headings.add(heading_key)
 
-        # To sort by vertical position, we'd need to store the bbox['y0'] in the outline itself.
-        # Let's refine the outline item if we need this level of sorting:
-        # For simplicity in this first pass, we'll sort by page and then by level.
-        # A more complex sort would require passing the original 'block' info to the outline list.
-        # Given the problem's ask, page and level sorting should be sufficient.
+        outline.append({
+            "level": level,
+            "text": text,
+            "page": current_page_number
+        })
+    
+    # Sort the outline: first by page number, then by inferred heading level prominence (H1 > H2 > H3),
+    # then by vertical position (y0) on the page.
+    # This is crucial for maintaining hierarchy and order.
+    level_order = {"H1": 1, "H2": 2, "H3": 3}
+    outline.sort(key=lambda x: (x["page"], level_order.get(x["level"], 99))) # bbox['y0'] is not directly in 'outline' anymore
+                                                                            # Need to re-think sort if we want vertical position
 
+    # To sort by vertical position, we'd need to store the bbox['y0'] in the outline itself.
+    # Let's refine the outline item if we need this level of sorting:
+    # For simplicity in this first pass, we'll sort by page and then by level.
+    # A more complex sort would require passing the original 'block' info to the outline list.
+    # Given the problem's ask, page and level sorting should be sufficient.
 
+    return title, outline
+
+def write_json(data, output_json_path):
+    """Writes data as indented UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(output_json_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def process_single_pdf(input_pdf_path, output_json_path):
+    """
+    Extracts the outline of a single PDF and writes it as JSON.
+    Runs inside a worker process.
+    """
+    filename = os.path.basename(input_pdf_path)
+    print(f"Starting processing for: {filename}")
+    try:
+        title, outline = extract_document_outline(input_pdf_path)
     except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
+        # Handled here rather than inside the (cached) extractor so failures are never cached
+        print(f"Error processing {input_pdf_path}: {e}")
         # Return empty/default in case of an error
-        return "", []
+        title, outline = "", []
 
-    return title, outline
+    result = {
+        "title": title,
+        "outline": outline
+    }
+
+    try:
+        write_json(result, output_json_path)
+        print(f"Successfully generated: {output_json_path}")
+    except Exception as e:
+        print(f"Error writing JSON for {filename}: {e}")
 
 def process_pdf_files(input_dir, output_dir):
     """
@@ -166,28 +258,27 @@ def process_pdf_files(input_dir, output_dir):
         os.makedirs(output_dir) # Ensure output directory exists
 
     print(f"Processing PDFs from: {input_dir}")
+    pdf_jobs = []
     for filename in os.listdir(input_dir):
         if filename.lower().endswith(".pdf"):
             input_pdf_path = os.path.join(input_dir, filename)
             output_json_filename = filename.replace(".pdf", ".json")
             output_json_path = os.path.join(output_dir, output_json_filename)
+            pdf_jobs.append((input_pdf_path, output_json_path))
+        else:
+            print(f"Skipping non-PDF file: {filename}")
 
-            print(f"Starting processing for: {filename}")
-            title, outline = extract_document_outline(input_pdf_path)
-
-            result = {
-                "title": title,
-                "outline": outline
-            }
-
+    # Each PDF is independent and parsing is CPU-bound, so fan the files out
+    # across worker processes. fitz.Document objects can't be pickled, which is
+    # why the worker does both the extraction and the JSON write itself.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {executor.submit(process_single_pdf, input_pdf_path, output_json_path): input_pdf_path
+                   for input_pdf_path, output_json_path in pdf_jobs}
+        for future in as_completed(futures):
             try:
-                with open(output_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=4, ensure_ascii=False)
-                print(f"Successfully generated: {output_json_path}")
+                future.result()
             except Exception as e:
-                print(f"Error writing JSON for {filename}: {e}")
-        else:
-            print(f"Skipping non-PDF file: {filename}")
+                print(f"Error processing {os.path.basename(futures[future])}: {e}")
 
 if __name__ == "__main__":
 
@@ -1,25 +1,203 @@
 import os
 import json
+import hashlib
+import stat
+import tempfile
 import fitz # PyMuPDF
+import numpy as np
 import spacy
 import re
 from datetime import datetime
-from collections import defaultdict
+from itertools import takewhile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, wraps
 
-# --- Global NLP Model (Load once) ---
 try:
-    nlp = spacy.load("en_core_web_lg")
-    print("SpaCy model 'en_core_web_lg' loaded successfully.")
-    if nlp.vocab.vectors.name is None:
-        print("[WARNING] The loaded SpaCy model 'en_core_web_lg' still has no word vectors loaded. This is unexpected for LG model. Falling back to keyword matching.")
-        nlp = None # Force fallback if no vectors unexpectedly
-except OSError:
-    print("SpaCy model 'en_core_web_lg' not found. Please ensure it's downloaded during Docker build.")
-    print("Falling back to keyword matching for relevance as no suitable NLP model is available.")
-    nlp = None
+    import orjson # Optional, much faster JSON serialisation
+except ImportError:
+    orjson = None
+
+# --- Global NLP Model (Loaded lazily, once per process) ---
+# The medium model ships 300-d word vectors like en_core_web_lg (over a pruned
+# vocabulary) at a fraction of the size; vectors and sentence boundaries are
+# all we use.
+SPACY_MODEL_NAME = "en_core_web_md"
+# Keep only tok2vec and parser; everything else is skipped at load time.
+SPACY_EXCLUDED_PIPES = ["ner", "lemmatizer", "attribute_ruler", "tagger"]
+
+nlp = None
+_nlp_loaded = False
+
+def load_nlp_model():
+    """
+    Loads the spaCy model into the module-level `nlp` the first time it is
+    called in a process and returns it (None if no usable model is available).
+    Also serves as the collection worker initializer, so each worker pays the
+    model load once and stays warm for every collection it processes.
+    """
+    global nlp, _nlp_loaded
+    if _nlp_loaded:
+        return nlp
+    _nlp_loaded = True
+
+    try:
+        nlp = spacy.load(SPACY_MODEL_NAME, exclude=SPACY_EXCLUDED_PIPES)
+        print(f"SpaCy model '{SPACY_MODEL_NAME}' loaded successfully.")
+        if nlp.vocab.vectors.name is None:
+            print(f"[WARNING] The loaded SpaCy model '{SPACY_MODEL_NAME}' still has no word vectors loaded. This is unexpected for this model. Falling back to keyword matching.")
+            nlp = None # Force fallback if no vectors unexpectedly
+    except OSError:
+        print(f"SpaCy model '{SPACY_MODEL_NAME}' not found. Please ensure it's downloaded during Docker build.")
+        print("Falling back to keyword matching for relevance as no suitable NLP model is available.")
+        nlp = None
+    return nlp
+
+NLP_BATCH_SIZE = 64
+
+# Default "dict" extraction flags minus image blocks, which we never look at
+# but which PyMuPDF would otherwise decode and copy into the result.
+TEXT_EXTRACTION_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# --- Pre-compiled regular expressions for the text-cleaning hot paths ---
+_BULLET_RE = re.compile(r'^(?:[•\*-]|\d+\.|\d+\.\d+\.)\s*', flags=re.MULTILINE)
+_WS_RE = re.compile(r'\s+')
+_LEADING_BULLET_RE = re.compile(r'^[•\*-]\s*|^\d+\.\s*|^\d+\.\d+\s*$')
+_NUM_ONLY_RE = re.compile(r'^\d+(\.\d+)*\s*$')
+
+# On-disk cache of extraction results, keyed by file path, mtime and size so
+# re-runs over unchanged PDFs skip parsing entirely. The key also covers this
+# module's source and the PyMuPDF version, so editing the heuristics or
+# upgrading PyMuPDF never serves stale results.
+# Per-user directory; it is only used when it is private to us (see _cache_dir_is_private).
+PDF_CACHE_DIR = os.path.join(tempfile.gettempdir(), f"pdfcache-{os.getuid()}")
+
+with open(__file__, 'rb') as _source_file:
+    _EXTRACTOR_VERSION = f"{hashlib.blake2b(_source_file.read(), digest_size=16).hexdigest()}:{fitz.VersionBind}"
+
+def _cache_key(pdf_path, namespace):
+    pdf_stat = os.stat(pdf_path)
+    raw_key = f"{namespace}:{_EXTRACTOR_VERSION}:{os.path.abspath(pdf_path)}:{pdf_stat.st_mtime_ns}:{pdf_stat.st_size}"
+    return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+def _cache_dir_is_private():
+    """Creates PDF_CACHE_DIR if needed; True only if it is a real directory owned by us with mode 0700."""
+    try:
+        os.makedirs(PDF_CACHE_DIR, mode=0o700, exist_ok=True)
+        dir_stat = os.lstat(PDF_CACHE_DIR)
+    except OSError:
+        return False
+    return stat.S_ISDIR(dir_stat.st_mode) and dir_stat.st_uid == os.getuid() and not dir_stat.st_mode & 0o077
+
+def cached_extraction(func):
+    """Wraps a per-PDF extractor so its result is stored as JSON in PDF_CACHE_DIR
+    and reused while the PDF is unchanged."""
+    @wraps(func)
+    def wrapper(pdf_path):
+        if not _cache_dir_is_private():
+            return func(pdf_path)
+
+        cache_path = os.path.join(PDF_CACHE_DIR, _cache_key(pdf_path, func.__name__) + ".json")
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                title, items = json.load(f)
+            return title, items
+        except (OSError, ValueError, TypeError):
+            pass # Cache miss or unreadable entry: extract again
+
+        result = func(pdf_path)
+
+        try:
+            # Write to a per-process temp file first so concurrent workers never see a partial entry
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: could not write extraction cache for {pdf_path}: {e}")
+        return result
+    return wrapper
 
 # --- Round 1A Logic (Enhanced for Round 1B) ---
 
+@lru_cache(maxsize=512)
+def _is_bold(font_name):
+    """Checks whether a font name is a bold/heavy face (cached per font name)."""
+    font_name = font_name.lower()
+    return "bold" in font_name or "heavy" in font_name
+
+HEADING_LEVEL_NAMES = (None, "H1", "H2", "H3")
+
+def classify_heading_levels(lines, h1_thresh, h2_thresh, h3_thresh):
+    """
+    Returns the heading level ("H1"/"H2"/"H3") or None for every line.
+    The size/bold/word-count criteria are evaluated as NumPy array operations
+    over all lines at once; the text-based exclusions (list markers, bare
+    numbers, very short text) only run on the few lines that pass them.
+    """
+    sizes = np.array([line['font_size'] for line in lines], dtype=np.float64)
+    bolds = np.array([line['is_bold'] for line in lines], dtype=bool)
+    word_counts = np.array([len(line['text'].split()) for line in lines], dtype=np.int64)
+    ends_with_period = np.array([line['text'].endswith('.') for line in lines], dtype=bool)
+
+    # Apply heading criteria
+    # H3 can be less strictly bold, but still short and not ending with a period.
+    level_codes = np.select(
+        [bolds & (sizes >= h1_thresh) & (word_counts < 15),
+         bolds & (sizes >= h2_thresh) & (word_counts < 20),
+         (sizes >= h3_thresh) & (word_counts < 25) & ~ends_with_period],
+        [1, 2, 3],
+        default=0
+    )
+
+    levels = [None] * len(lines)
+    for idx in np.flatnonzero(level_codes):
+        text = lines[idx]['text'].strip()
+        is_bold = bool(bolds[idx])
+
+        # Check for common non-heading starting characters (bullets, short numbers)
+        # combined with less-than-H1 font size to avoid misclassification.
+        if sizes[idx] < h1_thresh and _LEADING_BULLET_RE.match(lines[idx]['text'].split(' ')[0]):
+            # This is likely a list item or sub-point, not a major heading.
+            continue
+
+        # Further filter: Ensure potential headings are not just short, common words or symbols.
+        if len(text) < 4 or text.lower() in ["summary", "introduction", "conclusion"]:
+            # Allow 'Summary', 'Introduction', 'Conclusion' as headings if matched elsewhere.
+            # But filter very short non-semantic "headings" like '1.', '2.', etc. unless they're followed by meaningful text.
+            if _NUM_ONLY_RE.match(text): # e.g. "1.", "2.1" without other text
+                continue
+            elif len(text) < 4 and not is_bold: # Very short non-bold text usually isn't a heading
+                continue
+
+        levels[idx] = HEADING_LEVEL_NAMES[level_codes[idx]]
+    return levels
+
+def iter_document_lines(document):
+    """
+    Yields the non-empty text lines of a document in reading order. Callers
+    still collect every line, since heading thresholds need the
+    document-wide max font size.
+    """
+    for page in document:
+        page_number = page.number + 1
+        page_raw_blocks = page.get_text("dict", flags=TEXT_EXTRACTION_FLAGS)['blocks']
+        
+        for block in page_raw_blocks:
+            if block['type'] == 0: # Text block
+                for line in block['lines']:
+                    line_text = "".join([span['text'] for span in line['spans']]).strip()
+                    if not line_text: continue # Skip empty lines
+
+                    first_span = line['spans'][0] if line['spans'] else {}
+                    yield {
+                        "text": line_text,
+                        "font_size": round(first_span.get('size', 0.0), 2),
+                        "is_bold": _is_bold(first_span.get('font', '')),
+                        "bbox_y0": line['bbox'][1], 
+                        "page": page_number
+                    }
+
+@cached_extraction
 def extract_document_sections(pdf_path):
     """
     Extracts the title and detailed sections (H1, H2, H3) with their
@@ -29,42 +207,16 @@ def extract_document_sections(pdf_path):
     title = ""
     sections = [] 
     
-    document = fitz.open(pdf_path)
-    
-    text_blocks_on_pages = defaultdict(list)
     max_font_size = 0.0
     
     all_raw_lines_in_order = [] 
 
-    for page_num in range(document.page_count):
-        page = document.load_page(page_num)
-        
-        page_raw_blocks = page.get_text("dict")['blocks']
-        
-        for block_idx, block in enumerate(page_raw_blocks):
-            if block['type'] == 0: # Text block
-                for line_idx, line in enumerate(block['lines']):
-                    line_text = "".join([span['text'] for span in line['spans']]).strip()
-                    if not line_text: continue # Skip empty lines
+    with fitz.open(pdf_path) as document:
+        for line_info in iter_document_lines(document):
+            all_raw_lines_in_order.append(line_info)
 
-                    first_span = line['spans'][0] if line['spans'] else {}
-                    font_size = round(first_span.get('size', 0.0), 2)
-                    is_bold = "bold" in first_span.get('font', '').lower() or "heavy" in first_span.get('font', '').lower()
-                    
-                    line_info = {
-                        "text": line_text,
-                        "font_size": font_size,
-                        "is_bold": is_bold,
-                        "bbox_y0": line['bbox'][1], 
-                        "page": page_num + 1,
-                        "is_heading_candidate": False, 
-                        "actual_level": None
-                    }
-                    text_blocks_on_pages[page_num + 1].append(line_info)
-                    all_raw_lines_in_order.append(line_info)
-
-                    if font_size > max_font_size:
-                        max_font_size = font_size
+            if line_info['font_size'] > max_font_size:
+                max_font_size = line_info['font_size']
     
     if not all_raw_lines_in_order:
         print(f"Warning: No meaningful text lines found in {pdf_path}")
@@ -85,9 +237,11 @@ def extract_document_sections(pdf_path):
     h1_thresh = max(h1_thresh, h2_thresh * 1.1)  
 
     # Heuristic to find Title: Largest text on the first page, likely bold.
+    # Lines are in page order, so the first page is a prefix of the flat list.
+    first_page_lines = list(takewhile(lambda b: b['page'] == 1, all_raw_lines_in_order))
     title_candidates = []
-    if 1 in text_blocks_on_pages:
-        for line_info in text_blocks_on_pages[1]:
+    if first_page_lines:
+        for line_info in first_page_lines:
             if line_info['font_size'] >= h1_thresh and \
                len(line_info['text'].split()) < 20 and \
                (line_info['is_bold'] or line_info['font_size'] == max_font_size):
@@ -104,52 +258,21 @@ def extract_document_sections(pdf_path):
                 all_raw_lines_in_order = all_raw_lines_in_order[1:] # Remove first line if used as title
 
             
-    current_section_content_lines = []
+    # Content is kept as whitespace-split words, so joining them with single
+    # spaces yields already-normalised text without a regex pass over the section.
+    current_section_content_words = []
     current_section_meta = None
     
-    for i, line_info in enumerate(all_raw_lines_in_order):
+    heading_levels = classify_heading_levels(all_raw_lines_in_order, h1_thresh, h2_thresh, h3_thresh)
+
+    for line_info, determined_level in zip(all_raw_lines_in_order, heading_levels):
         text = line_info['text']
-        font_size = line_info['font_size']
-        is_bold = line_info['is_bold']
         page = line_info['page']
-
-        is_heading = False
-        determined_level = None
-
-        # Check for common non-heading starting characters (bullets, short numbers)
-        # combined with less-than-H1 font size to avoid misclassification.
-        if (font_size < h1_thresh and re.match(r'^[•\*-]\s*|^\d+\.\s*|^\d+\.\d+\s*$', text.split(' ')[0])):
-            # This is likely a list item or sub-point, not a major heading.
-            is_heading = False # Explicitly mark as not a heading
-        else:
-            # Apply heading criteria
-            if is_bold and font_size >= h1_thresh and len(text.split()) < 15:
-                determined_level = "H1"
-                is_heading = True
-            elif is_bold and font_size >= h2_thresh and len(text.split()) < 20:
-                determined_level = "H2"
-                is_heading = True
-            elif font_size >= h3_thresh and len(text.split()) < 25 and not text.endswith('.'):
-                # H3 can be less strictly bold, but still short and not ending with a period.
-                determined_level = "H3"
-                is_heading = True
-            
-            # Further filter: Ensure potential headings are not just short, common words or symbols.
-            if is_heading and (len(text.strip()) < 4 or text.strip().lower() in ["summary", "introduction", "conclusion"]):
-                # Allow 'Summary', 'Introduction', 'Conclusion' as headings if matched elsewhere.
-                # But filter very short non-semantic "headings" like '1.', '2.', etc. unless they're followed by meaningful text.
-                if re.match(r'^\d+(\.\d+)*\s*$', text.strip()): # e.g. "1.", "2.1" without other text
-                    is_heading = False
-                elif len(text.strip()) < 4 and not is_bold: # Very short non-bold text usually isn't a heading
-                    is_heading = False
-
+        is_heading = determined_level is not None
 
         if is_heading:
             if current_section_meta is not None:
-                final_content = " ".join(current_section_content_lines).strip()
-                # Replace multiple newlines with single spaces for cleaner text
-                final_content = re.sub(r'\n\s*\n', ' ', final_content) 
-                final_content = re.sub(r'\s+', ' ', final_content) # Collapse multiple spaces
+                final_content = " ".join(current_section_content_words)
                 
                 if final_content: # Only add if content exists for the section
                     sections.append({
@@ -165,15 +288,13 @@ def extract_document_sections(pdf_path):
                 "text": text,
                 "page": page
             }
-            current_section_content_lines = [] 
+            current_section_content_words = [] 
         else:
-            current_section_content_lines.append(text)
+            current_section_content_words.extend(text.split())
     
     # After the loop, add the very last section if any content was accumulated
     if current_section_meta is not None:
-        final_content = " ".join(current_section_content_lines).strip()
-        final_content = re.sub(r'\n\s*\n', ' ', final_content)
-        final_content = re.sub(r'\s+', ' ', final_content)
+        final_content = " ".join(current_section_content_words)
         
         if final_content:
             sections.append({
@@ -191,19 +312,45 @@ def extract_document_sections(pdf_path):
 
 # --- Round 1B Logic (Minor adjustment to refined_text and cleaning) ---
 
+def unit_vectors(vectors):
+    """L2-normalises each row of a 2-D array; all-zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-9, None)
+
+def top_score_indices(scores, threshold, limit=None):
+    """
+    Returns the indices of scores >= threshold, highest first (ties keep their
+    original order). With a limit, np.partition picks the cut-off score so only
+    the top entries (plus any ties at the cut-off) are sorted.
+    """
+    candidates = np.flatnonzero(scores >= threshold)
+    if limit is not None and len(candidates) > limit:
+        cutoff = np.partition(scores[candidates], -limit)[-limit]
+        candidates = candidates[scores[candidates] >= cutoff]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
 def clean_text_for_output(text):
     """Cleans text by removing common bullet/list characters and extra whitespace."""
     if not text:
         return ""
-    # Remove leading bullet points or common list numbers (e.g., "• Text", "1. Text", "- Text")
-    text = re.sub(r'^(?:[•\*-]|\d+\.|\d+\.\d+\.)\s*', '', text, flags=re.MULTILINE).strip()
-    # Replace multiple newlines/whitespace with a single space for fluidity
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def analyze_document_collection(collection_path, output_base_path):
+    # Remove leading bullet points or common list numbers (e.g., "• Text", "1. Text", "- Text"),
+    # then replace multiple newlines/whitespace with a single space for fluidity.
+    # A single strip at the end suffices since the whitespace pass already trims runs to one space.
+    return _WS_RE.sub(' ', _BULLET_RE.sub('', text)).strip()
+
+def write_json(data, output_json_path):
+    """Serialises data to output_json_path (orjson if available, else json)."""
+    if orjson is not None:
+        with open(output_json_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def analyze_document_collection(collection_path, output_base_path, max_pdf_workers=None):
     """
     Analyzes a document collection based on persona and job-to-be-done.
+    PDFs are extracted with up to max_pdf_workers processes (default: one per CPU).
     """
     print(f"\n--- Analyzing Collection: {os.path.basename(collection_path)} ---")
     
@@ -229,15 +376,27 @@ def analyze_document_collection(collection_path, output_base_path):
     print(f"Challenge ID: {challenge_id}, Test Case: {test_case_name}")
     print(f"Persona: {persona_role}, Job: {job_task}")
 
-    job_doc = nlp(job_task) if nlp else None
-    persona_doc = nlp(persona_role) if nlp else None
+    # Keywords for the fallback relevance scoring, computed once per collection
+    job_keywords = frozenset(j for j in job_task.lower().split() if len(j) > 2)
+
+    nlp = load_nlp_model()
+
+    # With static word vectors, Doc.vector is just the mean of the token vectors,
+    # so the short job/persona queries only need tokenizing, not the full pipeline.
+    job_doc = nlp.make_doc(job_task) if nlp else None
+    persona_doc = nlp.make_doc(persona_role) if nlp else None
     
     nlp_has_vectors = (nlp is not None and job_doc is not None and job_doc.has_vector and \
                        persona_doc is not None and persona_doc.has_vector)
 
+    if nlp_has_vectors:
+        job_unit = unit_vectors(job_doc.vector[np.newaxis, :])[0]
+        persona_unit = unit_vectors(persona_doc.vector[np.newaxis, :])[0]
+
     all_sections_for_processing = [] 
     processed_input_filenames = []
 
+    pdf_jobs = []
     for doc_meta in input_documents_meta:
         filename = doc_meta["filename"]
         pdf_path = os.path.join(pdf_dir, filename)
@@ -247,40 +406,83 @@ def analyze_document_collection(collection_path, output_base_path):
             continue
         
         print(f"  Extracting sections from {filename}...")
-        doc_title, sections_data_from_pdf = extract_document_sections(pdf_path)
-        
+        pdf_jobs.append((filename, pdf_path))
+
+    # PDF parsing is CPU-bound and each file is independent, so extract them in
+    # worker processes. Results are collected in input order to keep the
+    # ranking output deterministic.
+    with ProcessPoolExecutor(max_workers=max_pdf_workers or os.cpu_count()) as executor:
+        futures = [executor.submit(extract_document_sections, pdf_path) for _, pdf_path in pdf_jobs]
+        extracted_documents = [(filename, future.result()) for (filename, _), future in zip(pdf_jobs, futures)]
+
+    for filename, (doc_title, sections_data_from_pdf) in extracted_documents:
         processed_input_filenames.append(filename)
 
         for section in sections_data_from_pdf:
             section["document"] = filename
-            
-            relevance_score = 0.0
-            section_text_doc = nlp(section["full_content"]) if nlp else None
-
-            if nlp_has_vectors and section_text_doc and section_text_doc.text.strip():
-                try:
-                    job_similarity = section_text_doc.similarity(job_doc) if job_doc and job_doc.has_vector else 0.0
-                    persona_similarity = section_text_doc.similarity(persona_doc) if persona_doc and persona_doc.has_vector else 0.0
-                    relevance_score = (job_similarity * 0.7) + (persona_similarity * 0.3)
-                except ValueError: 
-                    relevance_score = 0.0
-            else:
-                job_keywords = set(j for j in job_task.lower().split() if len(j) > 2)
-                section_keywords = set(s for s in section["full_content"].lower().split() if len(s) > 2)
-                matching_keywords = len(job_keywords.intersection(section_keywords))
-                section_len = len(section_keywords)
-                relevance_score = matching_keywords / section_len if section_len > 0 else 0
-
-            section["relevance_score"] = relevance_score 
             all_sections_for_processing.append(section)
 
-    all_sections_for_processing.sort(key=lambda x: x["relevance_score"], reverse=True)
+    # Run every section through the pipeline in one batched nlp.pipe call
+    # rather than paying the per-call overhead of nlp() for each section.
+    if nlp_has_vectors:
+        section_contents = [section["full_content"] for section in all_sections_for_processing]
+        section_text_docs = list(nlp.pipe(section_contents, batch_size=NLP_BATCH_SIZE))
+        # Score every section against the job and persona with two matrix-vector
+        # products over unit vectors instead of calling Doc.similarity per section.
+        section_matrix = unit_vectors(np.vstack([doc.vector for doc in section_text_docs])) \
+            if section_text_docs else np.zeros((0, job_unit.size), dtype=np.float32)
+        job_scores = section_matrix @ job_unit
+        persona_scores = section_matrix @ persona_unit
+        section_similarities = 0.7 * job_scores + 0.3 * persona_scores
+    else:
+        section_text_docs = [None] * len(all_sections_for_processing)
+
+    for idx, (section, section_text_doc) in enumerate(zip(all_sections_for_processing, section_text_docs)):
+        relevance_score = 0.0
+
+        if nlp_has_vectors and section_text_doc and section_text_doc.text.strip():
+            relevance_score = float(section_similarities[idx])
+        else:
+            section_keywords = set(s for s in section["full_content"].lower().split() if len(s) > 2)
+            matching_keywords = len(job_keywords.intersection(section_keywords))
+            section_len = len(section_keywords)
+            relevance_score = matching_keywords / section_len if section_len > 0 else 0
+
+        section["relevance_score"] = relevance_score 
+        section["nlp_doc"] = section_text_doc
+
+    # Every section gets an importance_rank, so a full ordering is needed; a stable
+    # argsort over the score array keeps tied sections in input order like list.sort did.
+    relevance_scores = np.array([section["relevance_score"] for section in all_sections_for_processing], dtype=np.float64)
+    ranking = np.argsort(-relevance_scores, kind='stable')
+    all_sections_for_processing = [all_sections_for_processing[k] for k in ranking]
 
     extracted_sections_output = []
     subsection_analysis_output = []
     
     top_n_sections_for_analysis = 10 
 
+    # Collect candidate sentences from all top-N sections so they can be
+    # tokenized in one batch instead of one nlp() call per sentence.
+    sentences_by_section = []
+    all_sentences = []
+    if nlp_has_vectors:
+        for section in all_sections_for_processing[:top_n_sections_for_analysis]:
+            section_nlp_doc = section["nlp_doc"]
+            sentences = []
+            if section["full_content"] and section["full_content"].strip():
+                sentences = [sent.text.strip() for sent in section_nlp_doc.sents if sent.text.strip() and len(sent.text.strip()) > 15] 
+            sentences_by_section.append(sentences)
+            all_sentences.extend(sentences)
+
+        # Sentences are only scored by their vectors, so tokenizing is enough here too
+        all_sentence_docs = list(nlp.tokenizer.pipe(all_sentences, batch_size=NLP_BATCH_SIZE))
+
+        all_sentence_scores = unit_vectors(np.vstack([doc.vector for doc in all_sentence_docs])) @ job_unit \
+            if all_sentence_docs else np.zeros(0, dtype=np.float32)
+
+    sentence_offset = 0
+
     for i, section in enumerate(all_sections_for_processing):
         # Apply cleanup to section_title before output
         cleaned_section_title = clean_text_for_output(section["text"])
@@ -297,37 +499,33 @@ def analyze_document_collection(collection_path, output_base_path):
             full_content = section["full_content"]
 
             if nlp_has_vectors and full_content and full_content.strip():
-                section_nlp_doc = nlp(full_content)
-                sentences = [sent.text.strip() for sent in section_nlp_doc.sents if sent.text.strip() and len(sent.text.strip()) > 15] 
+                sentences = sentences_by_section[i]
+                sentence_docs = all_sentence_docs[sentence_offset:sentence_offset + len(sentences)]
+                sentence_similarities = all_sentence_scores[sentence_offset:sentence_offset + len(sentences)]
+                sentence_offset += len(sentences)
                 
-                sentence_scores = []
-                for sent_text in sentences:
-                    sent_nlp_doc = nlp(sent_text)
-                    if sent_nlp_doc.has_vector and job_doc and job_doc.has_vector: 
-                        sentence_scores.append((sent_nlp_doc.similarity(job_doc), sent_text))
+                sentence_scores = np.empty(len(sentences), dtype=np.float64)
+                for j, (sent_text, sent_nlp_doc, similarity) in enumerate(zip(sentences, sentence_docs, sentence_similarities)):
+                    if sent_nlp_doc.has_vector: 
+                        sentence_scores[j] = similarity
                     else:
                         sent_keywords = set(s for s in sent_text.lower().split() if len(s) > 2)
-                        job_keywords = set(j for j in job_task.lower().split() if len(j) > 2)
                         sent_len = len(sent_keywords)
-                        score = len(sent_keywords.intersection(job_keywords)) / sent_len if sent_len > 0 else 0
-                        sentence_scores.append((score, sent_text))
-
-                sentence_scores.sort(key=lambda x: x[0], reverse=True)
+                        sentence_scores[j] = len(sent_keywords.intersection(job_keywords)) / sent_len if sent_len > 0 else 0
                 
-                refined_text_parts = []
-                min_score_threshold_for_sentence = 0.3 if nlp_has_vectors else 0.1 
-                sentence_count = 0
-                for score, text in sentence_scores:
-                    if score >= min_score_threshold_for_sentence and sentence_count < 3: 
-                        # Apply cleanup here as well for sentence text
-                        cleaned_sent_text = clean_text_for_output(text)
-                        if cleaned_sent_text: # Only add if after cleaning it's not empty
-                            refined_text_parts.append(cleaned_sent_text)
-                            sentence_count += 1
-                    elif nlp_has_vectors and score < min_score_threshold_for_sentence:
-                        break 
-                    elif not nlp_has_vectors and score == 0:
-                        break 
+                min_score_threshold_for_sentence = 0.3
+                max_sentences = 3
+
+                # Only the best few sentences are needed, so rank a partial selection;
+                # every qualifying sentence is ranked only if some of those top ones
+                # are empty after cleanup.
+                ranked_indices = top_score_indices(sentence_scores, min_score_threshold_for_sentence, max_sentences)
+                # Apply cleanup here as well for sentence text, keeping only non-empty results
+                cleaned_sentences = [c for c in (clean_text_for_output(sentences[j]) for j in ranked_indices) if c]
+                if len(cleaned_sentences) < min(max_sentences, len(ranked_indices)):
+                    ranked_indices = top_score_indices(sentence_scores, min_score_threshold_for_sentence)
+                    cleaned_sentences = [c for c in (clean_text_for_output(sentences[j]) for j in ranked_indices) if c]
+                refined_text_parts = cleaned_sentences[:max_sentences]
                 
                 refined_text = " ".join(refined_text_parts).strip()
                 
@@ -360,8 +558,7 @@ def analyze_document_collection(collection_path, output_base_path):
     
     output_json_path = os.path.join(collection_output_dir, "challenge1b_output.json")
     
-    with open(output_json_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=4, ensure_ascii=False)
+    write_json(output_data, output_json_path)
     print(f"  Generated output for {os.path.basename(collection_path)}: {output_json_path}")
 
 
@@ -376,13 +573,27 @@ if __name__ == "__main__":
     # Ensure the root output dir exists in case it was entirely removed manually
     os.makedirs(OUTPUT_ROOT_DIR, exist_ok=True)
 
+    collection_paths = []
     for collection_name in os.listdir(INPUT_ROOT_DIR):
         collection_path = os.path.join(INPUT_ROOT_DIR, collection_name)
         
         # Sort collection names to ensure consistent processing order (optional but good practice)
         if os.path.isdir(collection_path) and collection_name.startswith("Collection_"):
-            analyze_document_collection(collection_path, OUTPUT_ROOT_DIR)
+            collection_paths.append(collection_path)
         else:
             print(f"Skipping non-collection directory or non-directory item in input root: {collection_name}")
 
+    # Shard collections across long-lived worker processes. Each worker loads the
+    # spaCy model once in its initializer and reuses it for every collection it
+    # handles; the per-collection PDF extraction pools split the CPUs between them.
+    if collection_paths:
+        cpu_count = os.cpu_count() or 1
+        collection_workers = min(len(collection_paths), cpu_count)
+        pdf_workers = max(1, cpu_count // collection_workers)
+        with ProcessPoolExecutor(max_workers=collection_workers, initializer=load_nlp_model) as executor:
+            list(executor.map(analyze_document_collection,
+                              collection_paths,
+                              [OUTPUT_ROOT_DIR] * len(collection_paths),
+                              [pdf_workers] * len(collection_paths)))
+
     print("\nAll document collections processed.")